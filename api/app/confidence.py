@@ -1,7 +1,32 @@
 """Confidence scoring: final = 0.6*heuristic + 0.4*(model_confidence*100)."""
+import math
 import re
-from typing import Optional
-from .schemas import ConfidenceBadge
+from functools import lru_cache
+from typing import Final, Optional
+from .schemas import ConfidenceBadge, IdentifierType
+
+# --- Precompiled patterns (compiled once at import, reused on every call) ---
+
+_INV_RE: Final[re.Pattern[str]] = re.compile(r'INV(OICE)?[\s#\-:]*\d+')
+_DIGITS_3_RE: Final[re.Pattern[str]] = re.compile(r'\d{3,}')
+_BOL_RE: Final[re.Pattern[str]] = re.compile(r'(B/?L|BOL|BILL\s*OF\s*LADING)[\s#\-:]*\w+')
+_CARRIER_RE: Final[re.Pattern[str]] = re.compile(r'^[A-Z]{4}\d{7,}')
+_ALNUM_ID_RE: Final[re.Pattern[str]] = re.compile(r'^[A-Z0-9]{8,}$')
+_ZIP_RE: Final[re.Pattern[str]] = re.compile(r'\b\d{5}(-\d{4})?\b')
+_STATE_ZIP_RE: Final[re.Pattern[str]] = re.compile(r'\b[A-Z]{2}\s+\d{5}')
+_STREET_RE: Final[re.Pattern[str]] = re.compile(r'\b(street|st|ave|avenue|road|rd|blvd|drive|dr|lane|ln)\b')
+# One pass for currency: symbol anywhere, else a whole-string comma-grouped number.
+# The named group that matched decides the score (see _CURRENCY_SCORES).
+_CURRENCY_RE: Final[re.Pattern[str]] = re.compile(
+    r'(?P<symbol>[$€£¥]\s*[\d,]+\.?\d*)'
+    r'|^\s*(?P<grouped>\d{1,3}(?:,\d{3})*(?:\.\d{2})?)\s*$'
+)
+_CURRENCY_SCORES = {'symbol': 95.0, 'grouped': 90.0}
+# Characters dropped before the float() fallback, in one pass
+_CURRENCY_STRIP: Final = str.maketrans('', '', ',$€')
+_COMPANY_SUFFIX_RE: Final[re.Pattern[str]] = re.compile(r'\b(LLC|INC|CORP|LTD|CO|COMPANY|INDUSTRIES|ENTERPRISES)\b')
+_HTS_FULL_RE: Final[re.Pattern[str]] = re.compile(r'^\d{4}\.\d{2}(\.\d{2,4})?$')
+_NUMERIC_CELL_RE: Final[re.Pattern[str]] = re.compile(r'^[\d,.$€£¥\-\s]+$')
 
 
 def get_badge(final_confidence: int) -> ConfidenceBadge:
@@ -24,12 +49,15 @@ def heuristic_invoice_number(value: Optional[str]) -> float:
     """Boost if value matches INV/INVOICE patterns."""
     if not value:
         return 0.0
+    # Pure digit strings can't carry an INV prefix; skip the regexes
+    if value.isdecimal():
+        return 70.0 if len(value) >= 3 else 40.0
     value_upper = value.upper()
     # Strong pattern: INV-123, INVOICE #123, etc.
-    if re.search(r'INV(OICE)?[\s#\-:]*\d+', value_upper):
+    if _INV_RE.search(value_upper):
         return 95.0
     # Has digits (likely an invoice number)
-    if re.search(r'\d{3,}', value):
+    if _DIGITS_3_RE.search(value):
         return 70.0
     return 40.0
 
@@ -40,13 +68,13 @@ def heuristic_bol_number(value: Optional[str]) -> float:
         return 0.0
     value_upper = value.upper()
     # Strong patterns
-    if re.search(r'(B/?L|BOL|BILL\s*OF\s*LADING)[\s#\-:]*\w+', value_upper):
+    if _BOL_RE.search(value_upper):
         return 95.0
     # Carrier prefixes (MAEU, HLCU, COSU, etc.) followed by numbers
-    if re.search(r'^[A-Z]{4}\d{7,}', value_upper):
+    if _CARRIER_RE.search(value_upper):
         return 90.0
     # Alphanumeric with reasonable length
-    if re.search(r'^[A-Z0-9]{8,}$', value_upper):
+    if _ALNUM_ID_RE.search(value_upper):
         return 65.0
     return 40.0
 
@@ -56,19 +84,19 @@ def heuristic_address(value: Optional[str]) -> float:
     if not value:
         return 0.0
     # US ZIP pattern
-    if re.search(r'\b\d{5}(-\d{4})?\b', value):
+    if _ZIP_RE.search(value):
         return 90.0
     # State abbreviations
-    if re.search(r'\b[A-Z]{2}\s+\d{5}', value.upper()):
+    if _STATE_ZIP_RE.search(value.upper()):
         return 90.0
     # Street patterns
-    if re.search(r'\b(street|st|ave|avenue|road|rd|blvd|drive|dr|lane|ln)\b', value.lower()):
+    if _STREET_RE.search(value.lower()):
         return 85.0
     # Has comma separators (city, state format)
     if ',' in value and len(value) > 10:
         return 70.0
     # Generic - has numbers and letters
-    if re.search(r'\d+', value) and len(value) > 5:
+    if len(value) > 5 and any(map(str.isdecimal, value)):
         return 50.0
     return 30.0
 
@@ -77,19 +105,20 @@ def heuristic_currency_value(value: Optional[str]) -> float:
     """Boost if value is parseable as numeric/currency."""
     if not value:
         return 0.0
-    # Currency symbols
-    if re.search(r'[$€£¥][\d,]+\.?\d*', value):
-        return 95.0
-    # Plain number with decimals
-    if re.search(r'^\d{1,3}(,\d{3})*(\.\d{2})?$', value.strip()):
-        return 90.0
-    # Just digits
+    # Bare digits: comma-grouped branch only matches up to 3 digits
+    if value.isdecimal():
+        return 90.0 if len(value) <= 3 else 85.0
+    # Currency symbol (95) or comma-grouped number (90)
+    match = _CURRENCY_RE.search(value)
+    if match is not None:
+        return _CURRENCY_SCORES[match.lastgroup]
+    # Anything else float() accepts (1.200,00 / 1e5 / 1_000) is a plain number (85)
     try:
-        float(value.replace(',', '').replace('$', '').replace('€', ''))
-        return 85.0
+        number = float(value.translate(_CURRENCY_STRIP))
     except ValueError:
-        pass
-    return 30.0
+        return 30.0
+    # nan/inf parse as floats but aren't amounts
+    return 85.0 if math.isfinite(number) else 30.0
 
 
 def heuristic_name(value: Optional[str]) -> float:
@@ -97,7 +126,7 @@ def heuristic_name(value: Optional[str]) -> float:
     if not value:
         return 0.0
     # Company suffixes
-    if re.search(r'\b(LLC|INC|CORP|LTD|CO|COMPANY|INDUSTRIES|ENTERPRISES)\b', value.upper()):
+    if _COMPANY_SUFFIX_RE.search(value.upper()):
         return 90.0
     # Has reasonable length and capitalization
     if len(value) > 3 and value[0].isupper():
@@ -109,34 +138,48 @@ def heuristic_hts_code(value: Optional[str]) -> float:
     """Boost HTS codes (digits or dotted patterns like 8471.30.0000)."""
     if not value:
         return 0.0
+    # Digits only: decide on length without touching the regex engine
+    if value.isdecimal():
+        return 80.0 if 6 <= len(value) <= 10 else 30.0
     # Full HTS format
-    if re.match(r'^\d{4}\.\d{2}(\.\d{2,4})?$', value):
+    if _HTS_FULL_RE.match(value):
         return 95.0
-    # Simplified digits only
-    if re.match(r'^\d{6,10}$', value):
-        return 80.0
     return 30.0
 
 
-def heuristic_table_cell(value: str, column_idx: int, column_values: list[str]) -> float:
-    """Table cell heuristic: numeric columns should be mostly numeric."""
-    if not value or value.strip() == '':
-        return 50.0
+def compute_column_stats(column_values: list[str]) -> tuple[float, int]:
+    """Return (numeric_ratio, non_empty) for a table column in a single pass."""
+    numeric_count = 0
+    non_empty = 0
+    for v in column_values:
+        if not v:
+            continue
+        stripped = v.strip()
+        if not stripped:
+            continue
+        non_empty += 1
+        if _NUMERIC_CELL_RE.match(stripped):
+            numeric_count += 1
 
-    # Check if this looks numeric
-    is_numeric = bool(re.match(r'^[\d,.$€£¥\-\s]+$', value.strip()))
+    if non_empty == 0:
+        return (0.0, 0)
+    return (numeric_count / non_empty, non_empty)
 
-    # Check column consistency
-    numeric_count = sum(
-        1 for v in column_values
-        if v and re.match(r'^[\d,.$€£¥\-\s]+$', v.strip())
-    )
-    total_non_empty = sum(1 for v in column_values if v and v.strip())
 
-    if total_non_empty == 0:
+def heuristic_table_cell(value: str, column_stats: tuple[float, int]) -> float:
+    """Table cell heuristic: numeric columns should be mostly numeric.
+
+    `column_stats` comes from `compute_column_stats()`, computed once per column.
+    """
+    if not value or value.strip() == '':
         return 50.0
 
-    numeric_ratio = numeric_count / total_non_empty
+    numeric_ratio, non_empty = column_stats
+    if non_empty == 0:
+        return 50.0
+
+    # Check if this looks numeric
+    is_numeric = bool(_NUMERIC_CELL_RE.match(value.strip()))
 
     # If column is mostly numeric
     if numeric_ratio > 0.7:
@@ -164,29 +207,64 @@ FIELD_HEURISTICS = {
 }
 
 
+def _default_heuristic(value: Optional[str]) -> float:
+    """Fallback heuristic for fields without a specific pattern."""
+    return 50.0
+
+
+@lru_cache(maxsize=512)
+def _field_heuristic(field_name: str, value: str) -> float:
+    """Heuristic score for a field value, memoized per (field_name, value).
+
+    Only the heuristic is cached; the model-confidence blend is cheap and
+    computed exactly on every call.
+    """
+    return FIELD_HEURISTICS.get(field_name, _default_heuristic)(value)
+
+
 def score_canonical_field(field_name: str, value: Optional[str], model_confidence: float) -> tuple[int, ConfidenceBadge]:
     """Score a canonical field and return (final_confidence, badge)."""
     if value is None:
         return (0, ConfidenceBadge.LOW)
 
-    heuristic_fn = FIELD_HEURISTICS.get(field_name, lambda x: 50.0)
-    heuristic = heuristic_fn(value)
+    heuristic = _field_heuristic(field_name, value)
     final = compute_final_confidence(heuristic, model_confidence)
     return (final, get_badge(final))
 
 
-def score_identifier(identifier_type: str, value: str, model_confidence: float) -> tuple[int, ConfidenceBadge]:
-    """Score an identifier based on its type."""
-    type_upper = identifier_type.upper()
+def _generic_id_heuristic(value: str) -> float:
+    """Generic ID pattern for PO/booking numbers."""
+    return max(heuristic_invoice_number(value), 60.0)
 
-    if 'BOL' in type_upper or 'BILL_OF_LADING' in type_upper or 'AWB' in type_upper:
-        heuristic = heuristic_bol_number(value)
-    elif 'INVOICE' in type_upper:
-        heuristic = heuristic_invoice_number(value)
-    elif 'PO' in type_upper or 'BOOKING' in type_upper:
-        heuristic = max(heuristic_invoice_number(value), 60.0)  # Generic ID pattern
-    else:
-        heuristic = 60.0  # Default for OTHER
 
+def _other_id_heuristic(value: str) -> float:
+    """Default for identifiers without a specific pattern."""
+    return 60.0
+
+
+ID_HEURISTICS = {
+    IdentifierType.BILL_OF_LADING: heuristic_bol_number,
+    IdentifierType.HOUSE_BOL_HBL: heuristic_bol_number,
+    IdentifierType.MASTER_BOL_MBL: heuristic_bol_number,
+    IdentifierType.AIR_WAYBILL_AWB: heuristic_bol_number,
+    IdentifierType.INVOICE_NUMBER: heuristic_invoice_number,
+    IdentifierType.PO_NUMBER: _generic_id_heuristic,
+    IdentifierType.BOOKING_NUMBER: _generic_id_heuristic,
+}
+
+
+@lru_cache(maxsize=512)
+def _identifier_heuristic(identifier_type: IdentifierType, value: str) -> float:
+    """Heuristic score for an identifier, memoized per (type, value)."""
+    return ID_HEURISTICS.get(identifier_type, _other_id_heuristic)(value)
+
+
+def score_identifier(identifier_type: IdentifierType, value: str, model_confidence: float) -> tuple[int, ConfidenceBadge]:
+    """Score an identifier based on its type.
+
+    Plain strings such as "BILL_OF_LADING" also work, since IdentifierType is
+    a str enum whose values match its member names.
+    """
+    heuristic = _identifier_heuristic(identifier_type, value)
     final = compute_final_confidence(heuristic, model_confidence)
     return (final, get_badge(final))
@@ -1,18 +1,53 @@
 """FastAPI backend for document extraction."""
+import hashlib
+import logging
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import tempfile
+from contextlib import asynccontextmanager
+from typing import IO, BinaryIO
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+import httpx
+from cachetools import TTLCache
 from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 from .schemas import ExtractionResponse
-from .extraction import ExtractionService
+from .extraction import ExtractionService, start_render_pool, shutdown_render_pool
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+# One pooled HTTP/2 client for all OpenAI calls. Multi-page PDFs fan out one
+# request per page, so the pool is sized well above httpx's defaults. Idle
+# connections are kept for a minute (httpx default: 5s) so uploads arriving a
+# few seconds apart reuse a warm TLS connection instead of handshaking again.
+openai_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0),
+    ),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fork PDF render workers before serving requests
+    start_render_pool()
+    yield
+    # Stop PDF render worker processes and close pooled connections
+    shutdown_render_pool()
+    await openai_client.close()
+
+
 app = FastAPI(
     title="Document Extraction API",
     description="Extract structured data from scanned PDFs using OpenAI vision",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -25,7 +60,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-extraction_service = ExtractionService()
+extraction_service = ExtractionService(client=openai_client)
+
+# Successful extractions keyed by SHA-256 of the PDF bytes, so re-uploading the
+# same file skips OpenAI. Values are the serialized JSON body, so a hit skips
+# response-model validation and serialization as well.
+extraction_cache: TTLCache = TTLCache(maxsize=256, ttl=3600)
+
+MAX_FILE_SIZE = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _spool_upload(src: BinaryIO) -> tuple[IO[bytes], str, int]:
+    """Copy an upload into a new temp file in chunks, hashing as it goes.
+
+    Blocking (file creation, reads and writes), so the endpoint runs it once
+    in the threadpool. Returns (temp file, SHA-256 hex digest, size); the
+    caller closes the temp file, which deletes it.
+    """
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf")
+    try:
+        hasher = hashlib.sha256()
+        size = 0
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                raise HTTPException(status_code=422, detail="File too large (max 10MB)")
+            hasher.update(chunk)
+            tmp.write(chunk)
+        tmp.flush()
+    except BaseException:
+        tmp.close()
+        raise
+    return tmp, hasher.hexdigest(), size
 
 
 @app.get("/health")
@@ -54,28 +121,37 @@ async def extract_document(file: UploadFile = File(...)):
         # Be lenient - some browsers send different content types
         pass
 
-    # Read file contents
+    # Copy the upload to our own temp file so render workers can open it by
+    # path. Starlette has already spooled the whole body by now, so the size
+    # check stops the copy, not the upload.
     try:
-        contents = await file.read()
+        tmp, cache_key, size = await run_in_threadpool(_spool_upload, file.file)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read file: {str(e)}")
 
-    if len(contents) == 0:
-        raise HTTPException(status_code=422, detail="Empty file")
-
-    # Max file size: 10MB
-    max_size = 10 * 1024 * 1024
-    if len(contents) > max_size:
-        raise HTTPException(status_code=422, detail="File too large (max 10MB)")
-
-    # Extract
     try:
-        result = extraction_service.extract_from_pdf(contents)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
+        if size == 0:
+            raise HTTPException(status_code=422, detail="Empty file")
+
+        # Identical uploads reuse the previous result
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+        # Extract
+        try:
+            result = await extraction_service.extract_from_pdf(tmp.name)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
+    finally:
+        # Closing deletes the file
+        await run_in_threadpool(tmp.close)
 
     # If extraction had an error, return 500
     if result.extraction_error:
         raise HTTPException(status_code=500, detail=result.extraction_error)
 
+    extraction_cache[cache_key] = result.model_dump_json()
     return result
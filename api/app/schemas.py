@@ -1,7 +1,7 @@
 """Extraction response schema with nullable fields and confidence scoring."""
 from enum import Enum
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 
 class DocumentType(str, Enum):
@@ -23,6 +23,11 @@ class IdentifierType(str, Enum):
     OTHER = "OTHER"
 
 
+# Value -> member lookups, so untrusted model strings resolve without raising
+DOC_TYPE_MAP: dict[str, DocumentType] = {t.value: t for t in DocumentType}
+ID_TYPE_MAP: dict[str, IdentifierType] = {t.value: t for t in IdentifierType}
+
+
 class ConfidenceBadge(str, Enum):
     HIGH = "High"
     MEDIUM = "Med"
@@ -38,10 +43,18 @@ class Identifier(BaseModel):
 
 
 class TableRow(BaseModel):
+    # Rows are shared between the input and output of the row-merging passes,
+    # so they are immutable; building a new row is the only way to change one.
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     cells: list[Optional[str]]  # Allow null cells from model output
     row_confidence: float = Field(ge=0, le=1, default=0.5)
 
 
+# Validates a whole table's rows in one pydantic-core call
+TABLE_ROWS_ADAPTER: TypeAdapter[list[TableRow]] = TypeAdapter(list[TableRow])
+
+
 class Table(BaseModel):
     table_id: str
     title: Optional[str] = None
@@ -61,6 +74,8 @@ class LineItem(BaseModel):
 
 
 class CanonicalField(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     value: Optional[str] = None
     model_confidence: float = Field(ge=0, le=1, default=0.0)
     final_confidence: Optional[int] = None
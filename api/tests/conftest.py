@@ -0,0 +1,9 @@
+"""Shared fixtures."""
+import pytest
+from app.extraction import ExtractionService
+
+
+@pytest.fixture
+def service():
+    """A fresh service; its OpenAI client is only built if a test calls it."""
+    return ExtractionService()
@@ -2,7 +2,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
-from app.main import app
+from app.main import app, extraction_cache
 from app.schemas import ExtractionResponse, DocumentType
 
 client = TestClient(app)
@@ -16,6 +16,9 @@ class TestHealthEndpoint:
 
 
 class TestDocumentsEndpoint:
+    def setup_method(self):
+        extraction_cache.clear()
+
     def test_missing_file(self):
         """POST without file returns 422."""
         response = client.post("/api/documents")
@@ -39,6 +42,17 @@ class TestDocumentsEndpoint:
         assert response.status_code == 422
         assert "Empty" in response.json()["detail"]
 
+    @patch("app.main.extraction_service.extract_from_pdf")
+    def test_file_too_large(self, mock_extract):
+        """POST with a file over 10MB returns 422 without extracting."""
+        response = client.post(
+            "/api/documents",
+            files={"file": ("big.pdf", b"%PDF-1.4\n" + b"0" * (10 * 1024 * 1024), "application/pdf")},
+        )
+        assert response.status_code == 422
+        assert "too large" in response.json()["detail"]
+        mock_extract.assert_not_called()
+
     @patch("app.main.extraction_service.extract_from_pdf")
     def test_successful_extraction(self, mock_extract):
         """POST with valid PDF returns extraction result."""
@@ -90,3 +104,38 @@ class TestDocumentsEndpoint:
 
         assert response.status_code == 500
         assert "OpenAI" in response.json()["detail"]
+
+    @patch("app.main.extraction_service.extract_from_pdf")
+    def test_identical_upload_served_from_cache(self, mock_extract):
+        """Re-uploading the same PDF does not re-run extraction."""
+        mock_extract.return_value = ExtractionResponse(document_type=DocumentType.BOL)
+        pdf_content = b"%PDF-1.4\n"
+
+        responses = [
+            client.post(
+                "/api/documents",
+                files={"file": ("test.pdf", pdf_content, "application/pdf")},
+            )
+            for _ in range(2)
+        ]
+
+        assert [r.status_code for r in responses] == [200, 200]
+        assert responses[1].headers["content-type"] == "application/json"
+        assert responses[1].json() == responses[0].json()
+        assert responses[1].json()["document_type"] == "BOL"
+        mock_extract.assert_called_once()
+
+    @patch("app.main.extraction_service.extract_from_pdf")
+    def test_errors_not_cached(self, mock_extract):
+        """Failed extractions are retried on the next upload."""
+        mock_extract.return_value = ExtractionResponse(extraction_error="boom")
+        pdf_content = b"%PDF-1.4\n"
+
+        for _ in range(2):
+            response = client.post(
+                "/api/documents",
+                files={"file": ("test.pdf", pdf_content, "application/pdf")},
+            )
+            assert response.status_code == 500
+
+        assert mock_extract.call_count == 2
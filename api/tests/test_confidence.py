@@ -1,4 +1,5 @@
 """Tests for confidence scoring functions."""
+import re
 import pytest
 from app.confidence import (
     compute_final_confidence,
@@ -8,6 +9,9 @@ from app.confidence import (
     heuristic_address,
     heuristic_currency_value,
     heuristic_name,
+    heuristic_hts_code,
+    heuristic_table_cell,
+    compute_column_stats,
     score_canonical_field,
     score_identifier,
 )
@@ -57,6 +61,7 @@ class TestHeuristicInvoiceNumber:
 
     def test_digits_only(self):
         assert heuristic_invoice_number("123456789") == 70.0
+        assert heuristic_invoice_number("12") == 40.0
 
     def test_no_pattern(self):
         assert heuristic_invoice_number("ABC") == 40.0
@@ -92,6 +97,10 @@ class TestHeuristicAddress:
     def test_city_state_format(self):
         assert heuristic_address("Los Angeles, California") == 70.0
 
+    def test_generic_with_digits(self):
+        assert heuristic_address("Unit 42B") == 50.0
+        assert heuristic_address("Harbour") == 30.0
+
     def test_none_value(self):
         assert heuristic_address(None) == 0.0
 
@@ -106,10 +115,54 @@ class TestHeuristicCurrencyValue:
 
     def test_plain_number(self):
         assert heuristic_currency_value("1234.56") == 85.0
+        assert heuristic_currency_value("1234") == 85.0
+        assert heuristic_currency_value("500") == 90.0
+        assert heuristic_currency_value("1234,5") == 85.0
+
+    def test_symbol_inside_text(self):
+        assert heuristic_currency_value("USD $12,000.00") == 95.0
+
+    def test_non_numeric(self):
+        assert heuristic_currency_value("TBD") == 30.0
+        assert heuristic_currency_value("nan") == 30.0
 
     def test_none_value(self):
         assert heuristic_currency_value(None) == 0.0
 
+    @pytest.mark.parametrize("value", [
+        "1.200,00", "1e5", "1_000", " 12 ", "-5", ".5", "+1,000", "1,2,3",
+        "1,234.56", "500", "1234", "$1,234.56", "USD $12,000.00", "TBD", "12 USD",
+    ])
+    def test_matches_original_scoring(self, value):
+        """Scores are unchanged from the original search/float() implementation."""
+        assert heuristic_currency_value(value) == _original_currency_score(value)
+
+    @pytest.mark.parametrize("value,original,current", [
+        # Space after the symbol now counts as a symbol amount
+        ("$ 1,200.00", 85.0, 95.0),
+        ("€ 100", 85.0, 95.0),
+        # float() accepts these, but they aren't amounts
+        ("nan", 85.0, 30.0),
+        ("inf", 85.0, 30.0),
+    ])
+    def test_intentional_changes(self, value, original, current):
+        assert _original_currency_score(value) == original
+        assert heuristic_currency_value(value) == current
+
+
+def _original_currency_score(value: str) -> float:
+    """Reference copy of the pre-optimization heuristic_currency_value."""
+    if re.search(r'[$€£¥][\d,]+\.?\d*', value):
+        return 95.0
+    if re.search(r'^\d{1,3}(,\d{3})*(\.\d{2})?$', value.strip()):
+        return 90.0
+    try:
+        float(value.replace(',', '').replace('$', '').replace('€', ''))
+        return 85.0
+    except ValueError:
+        pass
+    return 30.0
+
 
 class TestHeuristicName:
     def test_company_suffix(self):
@@ -123,6 +176,50 @@ class TestHeuristicName:
         assert heuristic_name(None) == 0.0
 
 
+class TestHeuristicHtsCode:
+    def test_full_hts_format(self):
+        assert heuristic_hts_code("8471.30.0100") == 95.0
+        assert heuristic_hts_code("8471.30") == 95.0
+
+    def test_digits_only(self):
+        assert heuristic_hts_code("847130") == 80.0
+        assert heuristic_hts_code("8471300100") == 80.0
+
+    def test_wrong_length_digits(self):
+        assert heuristic_hts_code("8471") == 30.0
+        assert heuristic_hts_code("84713001001") == 30.0
+
+    def test_none_value(self):
+        assert heuristic_hts_code(None) == 0.0
+
+
+class TestHeuristicTableCell:
+    def test_column_stats_single_pass(self):
+        ratio, non_empty = compute_column_stats(["10", "$2.50", "", "abc", None])
+        assert non_empty == 3
+        assert ratio == pytest.approx(2 / 3)
+
+    def test_column_stats_empty_column(self):
+        assert compute_column_stats(["", "  ", None]) == (0.0, 0)
+
+    def test_numeric_cell_in_numeric_column(self):
+        stats = compute_column_stats(["1", "2", "3", "4"])
+        assert heuristic_table_cell("5", stats) == 90.0
+
+    def test_text_cell_in_numeric_column(self):
+        stats = compute_column_stats(["1", "2", "3", "4"])
+        assert heuristic_table_cell("N/A", stats) == 40.0
+
+    def test_text_column(self):
+        stats = compute_column_stats(["Widget", "Gadget", "7"])
+        assert heuristic_table_cell("Widget", stats) == 75.0
+        assert heuristic_table_cell("ab", stats) == 60.0
+
+    def test_empty_cell(self):
+        stats = compute_column_stats(["1", "2"])
+        assert heuristic_table_cell("", stats) == 50.0
+
+
 class TestScoreCanonicalField:
     def test_invoice_number_high_confidence(self):
         final, badge = score_canonical_field("invoice_number", "INV-12345", 0.95)
@@ -134,6 +231,11 @@ class TestScoreCanonicalField:
         assert final == 0
         assert badge == ConfidenceBadge.LOW
 
+    def test_repeated_value_uses_exact_model_confidence(self):
+        # Heuristic is memoized per value; the model blend is not
+        assert score_canonical_field("total_value_of_goods", "$1,000.00", 1.0)[0] == 97
+        assert score_canonical_field("total_value_of_goods", "$1,000.00", 0.0)[0] == 57
+
 
 class TestScoreIdentifier:
     def test_bol_identifier(self):
@@ -144,3 +246,15 @@ class TestScoreIdentifier:
     def test_invoice_identifier(self):
         final, badge = score_identifier("INVOICE_NUMBER", "INV-999", 0.85)
         assert final >= 70
+
+    def test_house_bol_identifier(self):
+        final, _ = score_identifier("HOUSE_BOL_HBL", "MAEU1234567", 1.0)
+        assert final == compute_final_confidence(90.0, 1.0)
+
+    def test_booking_identifier_floor(self):
+        final, _ = score_identifier("BOOKING_NUMBER", "AB", 1.0)
+        assert final == compute_final_confidence(60.0, 1.0)
+
+    def test_other_identifier(self):
+        final, _ = score_identifier("OTHER", "INV-999", 1.0)
+        assert final == compute_final_confidence(60.0, 1.0)
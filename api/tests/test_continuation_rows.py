@@ -1,67 +1,54 @@
 """Tests for continuation row merging in table extraction."""
 import pytest
-from unittest.mock import patch, MagicMock
-from app.extraction import ExtractionService
 from app.schemas import TableRow
 
 
 class TestIsContinuationRow:
     """Tests for _is_continuation_row() detection logic."""
 
-    def setup_method(self):
-        with patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"}):
-            self.service = ExtractionService()
-
-    def test_continuation_row_true(self):
-        """Row with text in first cell, empty rest is continuation."""
-        cells = ["SCREW 4.37", "", "", ""]
-        assert self.service._is_continuation_row(cells) is True
-
-    def test_continuation_row_with_whitespace(self):
-        """Row with whitespace-only cells is continuation."""
-        cells = ["Description text", "  ", "", "   "]
-        assert self.service._is_continuation_row(cells) is True
-
-    def test_not_continuation_has_data(self):
-        """Row with data in other columns is not continuation."""
-        cells = ["148536001", "20", "7.91", "$158.10"]
-        assert self.service._is_continuation_row(cells) is False
-
-    def test_not_continuation_empty_first(self):
-        """Row with empty first cell is not continuation."""
-        cells = ["", "20", "7.91", "$158.10"]
-        assert self.service._is_continuation_row(cells) is False
-
-    def test_not_continuation_all_empty(self):
-        """Completely empty row is not continuation."""
-        cells = ["", "", "", ""]
-        assert self.service._is_continuation_row(cells) is False
-
-    def test_not_continuation_single_cell(self):
-        """Single cell row is not continuation (no 'other' columns)."""
-        cells = ["Some text"]
-        assert self.service._is_continuation_row(cells) is False
-
-    def test_not_continuation_empty_list(self):
-        """Empty cells list is not continuation."""
-        cells = []
-        assert self.service._is_continuation_row(cells) is False
+    @pytest.mark.parametrize("cells,expected", [
+        # Text in first cell, rest empty
+        pytest.param(["SCREW 4.37", "", "", ""], True, id="continuation"),
+        # Whitespace-only other cells count as empty
+        pytest.param(["Description text", "  ", "", "   "], True, id="whitespace-cells"),
+        # Data in other columns
+        pytest.param(["148536001", "20", "7.91", "$158.10"], False, id="has-data"),
+        pytest.param(["", "20", "7.91", "$158.10"], False, id="empty-first"),
+        pytest.param(["Description", "", "", "$158.10"], False, id="data-in-last-column"),
+        pytest.param(["", "", "", ""], False, id="all-empty"),
+        # No 'other' columns
+        pytest.param(["Some text"], False, id="single-cell"),
+        pytest.param([], False, id="empty-list"),
+    ])
+    def test_is_continuation_row(self, service, cells, expected):
+        assert service._is_continuation_row(cells) is expected
+
+    def test_continuation_text_is_stripped(self, service):
+        """_continuation_text returns the stripped description, or None."""
+        assert service._continuation_text(["  SCREW 4.37 ", "", " "]) == "SCREW 4.37"
+        assert service._continuation_text(["148536001", "20", "", ""]) is None
+
+    def test_whitespace_only_first_cell(self, service):
+        """Tabs, newlines and non-breaking spaces all count as blank."""
+        assert service._is_continuation_row([" \t\n\xa0", "", ""]) is False
+        assert service._is_continuation_row(["Description", "\t", "\xa0\u2003"]) is True
+
+    def test_null_cells_are_blank(self, service):
+        """Null cells from model output count as blank."""
+        assert service._is_continuation_row(["Description", None, None]) is True
+        assert service._is_continuation_row([None, "", ""]) is False
 
 
 class TestMergeContinuationRows:
     """Tests for _merge_continuation_rows() merging logic."""
 
-    def setup_method(self):
-        with patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"}):
-            self.service = ExtractionService()
-
-    def test_merge_single_continuation(self):
+    def test_merge_single_continuation(self, service):
         """Merge one continuation row into parent."""
         rows = [
             TableRow(cells=["148536001", "20", "7.91", "$158.10"], row_confidence=0.9),
             TableRow(cells=["SCREW 4.37", "", "", ""], row_confidence=0.8),
         ]
-        merged = self.service._merge_continuation_rows(rows)
+        merged = service._merge_continuation_rows(rows)
 
         assert len(merged) == 1
         assert merged[0].cells[0] == "148536001 - SCREW 4.37"
@@ -70,20 +57,29 @@ class TestMergeContinuationRows:
         assert merged[0].cells[3] == "$158.10"
         assert merged[0].row_confidence == 0.8  # Min of 0.9 and 0.8
 
-    def test_merge_multiple_continuations(self):
+    def test_merge_multiple_continuations(self, service):
         """Merge multiple consecutive continuation rows into parent."""
         rows = [
             TableRow(cells=["MODEL-A", "100", "$5.00", "$500.00"], row_confidence=0.9),
             TableRow(cells=["Line 1 description", "", "", ""], row_confidence=0.8),
             TableRow(cells=["Line 2 description", "", "", ""], row_confidence=0.7),
         ]
-        merged = self.service._merge_continuation_rows(rows)
+        merged = service._merge_continuation_rows(rows)
 
         assert len(merged) == 1
         assert merged[0].cells[0] == "MODEL-A - Line 1 description - Line 2 description"
         assert merged[0].row_confidence == 0.7  # Min of all
 
-    def test_merge_alternating_rows(self):
+    def test_merge_long_continuation_run(self, service):
+        """A long run of continuation lines is joined in order into one row."""
+        rows = [TableRow(cells=["MODEL-A", "100"], row_confidence=0.9)]
+        rows += [TableRow(cells=[f"line {n}", ""], row_confidence=0.8) for n in range(200)]
+        merged = service._merge_continuation_rows(rows)
+
+        assert len(merged) == 1
+        assert merged[0].cells == [" - ".join(["MODEL-A"] + [f"line {n}" for n in range(200)]), "100"]
+
+    def test_merge_alternating_rows(self, service):
         """Handle alternating data and continuation rows."""
         rows = [
             TableRow(cells=["148536001", "20", "7.91", "$158.10"], row_confidence=0.9),
@@ -91,7 +87,7 @@ class TestMergeContinuationRows:
             TableRow(cells=["S02620401", "6", "1.04", "$6.21"], row_confidence=0.88),
             TableRow(cells=["THREAD TAKE-UP SPRING", "", "", ""], row_confidence=0.82),
         ]
-        merged = self.service._merge_continuation_rows(rows)
+        merged = service._merge_continuation_rows(rows)
 
         assert len(merged) == 2
         assert merged[0].cells[0] == "148536001 - SCREW 4.37"
@@ -99,38 +95,49 @@ class TestMergeContinuationRows:
         assert merged[1].cells[0] == "S02620401 - THREAD TAKE-UP SPRING"
         assert merged[1].cells[1] == "6"
 
-    def test_no_continuation_rows(self):
+    def test_no_continuation_rows(self, service):
         """No merging when no continuation rows exist."""
         rows = [
             TableRow(cells=["MODEL-A", "100", "$5.00", "$500.00"], row_confidence=0.9),
             TableRow(cells=["MODEL-B", "50", "$10.00", "$500.00"], row_confidence=0.85),
         ]
-        merged = self.service._merge_continuation_rows(rows)
+        merged = service._merge_continuation_rows(rows)
 
         assert len(merged) == 2
         assert merged[0].cells == ["MODEL-A", "100", "$5.00", "$500.00"]
         assert merged[1].cells == ["MODEL-B", "50", "$10.00", "$500.00"]
 
-    def test_empty_rows_list(self):
+    def test_rows_without_continuation_are_reused(self, service):
+        """Rows with nothing to absorb are passed through without copying."""
+        rows = [
+            TableRow(cells=["MODEL-A", "100", "$5.00", "$500.00"], row_confidence=0.9),
+            TableRow(cells=["SCREW 4.37", "", "", ""], row_confidence=0.8),
+            TableRow(cells=["MODEL-B", "50", "$10.00", "$500.00"], row_confidence=0.85),
+        ]
+        merged = service._merge_continuation_rows(rows)
+        assert merged[0] is not rows[0]
+        assert merged[1] is rows[2]
+
+    def test_empty_rows_list(self, service):
         """Handle empty rows list."""
-        merged = self.service._merge_continuation_rows([])
+        merged = service._merge_continuation_rows([])
         assert merged == []
 
-    def test_single_row(self):
+    def test_single_row(self, service):
         """Handle single row (nothing to merge)."""
         rows = [TableRow(cells=["MODEL-A", "100", "$5.00", "$500.00"], row_confidence=0.9)]
-        merged = self.service._merge_continuation_rows(rows)
+        merged = service._merge_continuation_rows(rows)
 
         assert len(merged) == 1
         assert merged[0].cells == ["MODEL-A", "100", "$5.00", "$500.00"]
 
-    def test_first_row_is_continuation_style(self):
+    def test_first_row_is_continuation_style(self, service):
         """First row that looks like continuation stays as-is (no previous row)."""
         rows = [
             TableRow(cells=["Orphan description", "", "", ""], row_confidence=0.8),
             TableRow(cells=["MODEL-A", "100", "$5.00", "$500.00"], row_confidence=0.9),
         ]
-        merged = self.service._merge_continuation_rows(rows)
+        merged = service._merge_continuation_rows(rows)
 
         # First row stays as-is since there's no parent to merge into
         assert len(merged) == 2
@@ -141,86 +148,82 @@ class TestMergeContinuationRows:
 class TestNormalizeTableRows:
     """Tests for _normalize_table_rows() column alignment."""
 
-    def setup_method(self):
-        with patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"}):
-            self.service = ExtractionService()
-
-    def test_rows_already_match_headers(self):
+    def test_rows_already_match_headers(self, service):
         """Rows with correct column count remain unchanged."""
         headers = ["A", "B", "C"]
         rows = [
             TableRow(cells=["1", "2", "3"], row_confidence=0.9),
             TableRow(cells=["4", "5", "6"], row_confidence=0.8),
         ]
-        normalized = self.service._normalize_table_rows(headers, rows)
+        normalized = service._normalize_table_rows(headers, rows)
 
         assert len(normalized) == 2
         assert normalized[0].cells == ["1", "2", "3"]
         assert normalized[1].cells == ["4", "5", "6"]
 
-    def test_pad_short_rows(self):
+    def test_pad_short_rows(self, service):
         """Rows with fewer cells are padded with empty strings."""
         headers = ["A", "B", "C", "D"]
         rows = [
             TableRow(cells=["1", "2"], row_confidence=0.9),
         ]
-        normalized = self.service._normalize_table_rows(headers, rows)
+        normalized = service._normalize_table_rows(headers, rows)
 
         assert len(normalized[0].cells) == 4
         assert normalized[0].cells == ["1", "2", "", ""]
 
-    def test_merge_extra_cells(self):
+    def test_merge_extra_cells(self, service):
         """Rows with extra cells have them merged into last column."""
         headers = ["A", "B", "C"]
         rows = [
             TableRow(cells=["1", "2", "3", "4", "5"], row_confidence=0.9),
         ]
-        normalized = self.service._normalize_table_rows(headers, rows)
+        normalized = service._normalize_table_rows(headers, rows)
 
         assert len(normalized[0].cells) == 3
         assert normalized[0].cells[0] == "1"
         assert normalized[0].cells[1] == "2"
         assert normalized[0].cells[2] == "3 | 4 | 5"
 
-    def test_merge_extra_cells_skips_empty(self):
+    def test_merge_extra_cells_skips_empty(self, service):
         """Empty extra cells are not included in merge."""
         headers = ["A", "B"]
         rows = [
             TableRow(cells=["1", "2", "", "3", ""], row_confidence=0.9),
         ]
-        normalized = self.service._normalize_table_rows(headers, rows)
+        normalized = service._normalize_table_rows(headers, rows)
 
         assert len(normalized[0].cells) == 2
         assert normalized[0].cells[1] == "2 | 3"
 
-    def test_empty_headers(self):
+    def test_empty_headers(self, service):
         """Empty headers list returns rows unchanged."""
         headers = []
         rows = [
             TableRow(cells=["1", "2", "3"], row_confidence=0.9),
         ]
-        normalized = self.service._normalize_table_rows(headers, rows)
+        normalized = service._normalize_table_rows(headers, rows)
 
         assert normalized == rows
 
-    def test_empty_rows(self):
+    def test_empty_rows(self, service):
         """Empty rows list returns empty list."""
         headers = ["A", "B", "C"]
-        normalized = self.service._normalize_table_rows(headers, [])
+        normalized = service._normalize_table_rows(headers, [])
 
         assert normalized == []
 
-    def test_preserves_confidence(self):
+    def test_preserves_confidence(self, service):
         """Row confidence is preserved during normalization."""
         headers = ["A", "B", "C"]
         rows = [
             TableRow(cells=["1"], row_confidence=0.75),
         ]
-        normalized = self.service._normalize_table_rows(headers, rows)
+        normalized = service._normalize_table_rows(headers, rows)
 
         assert normalized[0].row_confidence == 0.75
 
-    def test_mixed_row_lengths(self):
+    def test_mixed_row_lengths(self, service):
         """Handle mix of short, correct, and long rows."""
         headers = ["A", "B", "C"]
         rows = [
@@ -228,7 +231,7 @@ class TestNormalizeTableRows:
             TableRow(cells=["2", "3", "4"], row_confidence=0.8),
             TableRow(cells=["5", "6", "7", "8"], row_confidence=0.7),
         ]
-        normalized = self.service._normalize_table_rows(headers, rows)
+        normalized = service._normalize_table_rows(headers, rows)
 
         assert normalized[0].cells == ["1", "", ""]
         assert normalized[1].cells == ["2", "3", "4"]
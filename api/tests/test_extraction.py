@@ -0,0 +1,518 @@
+"""Tests for the extraction retry loop (OpenAI calls mocked)."""
+import asyncio
+import base64
+import json
+import time
+import pytest
+import fitz
+from unittest.mock import AsyncMock, MagicMock
+from app.extraction import (
+    ExtractionService, EXTRACTION_PROMPT, PAGE_PROMPT, TEXT_PROMPT, TEXT_PROMPTS,
+    EXTRACTION_JSON_SCHEMA, MAX_LONG_SIDE_PX, MAX_OUTPUT_TOKENS, RESPONSE_FORMAT, RETRY_MAX_OUTPUT_TOKENS,
+    _TruncatedOutput, _classify_document_type, _classify_pdf, _render_page, shutdown_render_pool,
+)
+from app.schemas import ExtractionResponse, RawExtractionOutput
+from app.schemas import DocumentType, IdentifierType
+
+
+VALID_JSON = '{"document_type": "BOL", "bill_of_lading_number": "MAEU1234567", "bill_of_lading_number_confidence": 0.9}'
+
+
+def _iter_objects(schema: dict):
+    """Yield every object node in a JSON schema."""
+    if schema.get("type") == "object":
+        yield schema
+        for prop in schema["properties"].values():
+            yield from _iter_objects(prop)
+    if "items" in schema:
+        yield from _iter_objects(schema["items"])
+
+
+class TestResponseFormat:
+    def test_schema_is_strict(self):
+        """Strict mode needs every key required and no additional properties."""
+        objects = list(_iter_objects(EXTRACTION_JSON_SCHEMA))
+        assert len(objects) == 5
+        for obj in objects:
+            assert obj["additionalProperties"] is False
+            assert obj["required"] == list(obj["properties"])
+
+    def test_schema_covers_raw_output_fields(self):
+        assert set(EXTRACTION_JSON_SCHEMA["properties"]) == set(RawExtractionOutput.model_fields)
+
+    async def test_call_openai_requests_structured_output(self):
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(
+            return_value=MagicMock(choices=[MagicMock(message=MagicMock(content=VALID_JSON))])
+        )
+        service = ExtractionService(client=client)
+        assert await service._call_openai(["data:image/jpeg;base64,aW1n"], EXTRACTION_PROMPT) == VALID_JSON
+        assert client.chat.completions.create.await_args.kwargs["response_format"] is RESPONSE_FORMAT
+
+
+class TestClient:
+    def test_client_built_on_first_use(self, service, monkeypatch):
+        assert "client" not in vars(service)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        client = service.client
+        assert client.api_key == "test-key"
+        assert service.client is client
+
+    def test_injected_client_used(self):
+        client = MagicMock()
+        assert ExtractionService(client=client).client is client
+
+
+class TestExtractFromPdf:
+    """Tests for extract_from_pdf() validation and retry logic."""
+
+    @pytest.fixture
+    def service(self, service):
+        """A service with rendering stubbed out: no text layer, one page."""
+        service._text_layer = lambda pdf_bytes: None
+        service._pdf_to_images = lambda pdf_bytes: ["aW1n"]
+        return service
+
+    async def test_valid_json_first_attempt(self, service):
+        """Valid output on first attempt needs a single call."""
+        service._call_openai = AsyncMock(return_value=VALID_JSON)
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        assert result.document_type == DocumentType.BOL
+        assert result.bill_of_lading_number.value == "MAEU1234567"
+        assert result.bill_of_lading_number.model_dump() == {
+            "value": "MAEU1234567",
+            "model_confidence": 0.9,
+            "final_confidence": 90,
+            "badge": "High",
+        }
+        service._call_openai.assert_awaited_once_with(["aW1n"], EXTRACTION_PROMPT)
+
+    async def test_response_round_trips(self, service):
+        """The response serializes and re-validates to an equal ExtractionResponse."""
+        service._call_openai = AsyncMock(return_value=VALID_JSON)
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert ExtractionResponse.model_validate_json(result.model_dump_json()) == result
+
+    async def test_unknown_types_fall_back(self, service):
+        """Unrecognized document/identifier types map to UNKNOWN/OTHER."""
+        service._call_openai = AsyncMock(return_value=json.dumps({
+            "document_type": "AIRWAY_MANIFEST",
+            "identifiers": [{"type": "TRACKING_NUMBER", "value": "1Z999", "model_confidence": 0.8}],
+        }))
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.document_type == DocumentType.UNKNOWN
+        assert result.identifiers[0].type == IdentifierType.OTHER
+
+    async def test_invalid_json_triggers_repair(self, service):
+        """Invalid JSON is repaired text-only, without re-sending the page images."""
+        service._call_openai = AsyncMock(return_value="not json")
+        service._call_openai_repair = AsyncMock(return_value=VALID_JSON)
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        service._call_openai.assert_awaited_once()
+        bad_json, errors = service._call_openai_repair.await_args.args
+        assert bad_json == "not json"
+        assert errors
+
+    async def test_empty_output_resends_document(self, service):
+        """An empty response has nothing to repair, so the document is re-sent."""
+        service._call_openai = AsyncMock(side_effect=["", VALID_JSON])
+        service._call_openai_repair = AsyncMock()
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        assert service._call_openai.await_count == 2
+        service._call_openai_repair.assert_not_awaited()
+
+    async def test_truncated_output_resends_with_larger_budget(self, service):
+        """Output cut off at max_tokens re-sends the document instead of repairing the fragment."""
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=[
+            MagicMock(choices=[MagicMock(message=MagicMock(content=VALID_JSON[:40]), finish_reason="length")]),
+            MagicMock(choices=[MagicMock(message=MagicMock(content=VALID_JSON), finish_reason="stop")]),
+        ])
+        service.client = client
+        service._call_openai_repair = AsyncMock()
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        service._call_openai_repair.assert_not_awaited()
+        budgets = [call.kwargs["max_tokens"] for call in client.chat.completions.create.await_args_list]
+        assert budgets == [MAX_OUTPUT_TOKENS, RETRY_MAX_OUTPUT_TOKENS]
+
+    async def test_empty_truncated_output_resends_with_larger_budget(self, service):
+        """A truncated response with no content still gets the larger budget on retry."""
+        service._call_openai = AsyncMock(side_effect=[_TruncatedOutput(""), VALID_JSON])
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        assert service._call_openai.await_args_list[1].kwargs == {"max_tokens": RETRY_MAX_OUTPUT_TOKENS}
+
+    async def test_repair_prompt_embeds_output(self):
+        """The repair call sends the bad JSON and errors with the strict response format."""
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=MagicMock(
+            choices=[MagicMock(message=MagicMock(content=VALID_JSON))]
+        ))
+        service = ExtractionService(client=client)
+        assert await service._call_openai_repair("{bad", "Invalid JSON: eof") == VALID_JSON
+        kwargs = client.chat.completions.create.await_args.kwargs
+        assert kwargs["response_format"] == RESPONSE_FORMAT
+        assert kwargs["model"] == service.model
+        content = kwargs["messages"][0]["content"]
+        assert isinstance(content, str)
+        assert "{bad" in content and "Invalid JSON: eof" in content
+
+    async def test_retries_exhausted(self, service):
+        """Invalid output on the first call and the repair call returns an extraction error."""
+        service._call_openai = AsyncMock(return_value="not json")
+        service._call_openai_repair = AsyncMock(return_value="still not json")
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert "after 2 attempts" in result.extraction_error
+        service._call_openai.assert_awaited_once()
+        service._call_openai_repair.assert_awaited_once()
+
+    async def test_no_pages_rendered(self, service):
+        """Unrenderable PDF short-circuits without calling OpenAI."""
+        service._pdf_to_images = lambda pdf_bytes: []
+        service._call_openai = AsyncMock()
+        result = await service.extract_from_pdf(b"garbage")
+        assert result.extraction_error == "Failed to convert PDF to images"
+        service._call_openai.assert_not_awaited()
+
+    async def test_rendering_does_not_block_event_loop(self, service):
+        """Rendering runs off the event loop, so other requests keep being served."""
+        def slow_render(pdf_bytes):
+            time.sleep(0.2)
+            return ["aW1n"]
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        service._pdf_to_images = slow_render
+        service._call_openai = AsyncMock(return_value=VALID_JSON)
+        task = asyncio.create_task(ticker())
+        try:
+            result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        finally:
+            task.cancel()
+        assert result.extraction_error is None
+        assert ticks > 5
+
+
+def _make_pdf(page_texts: list[str], width: float = 612, height: float = 792) -> bytes:
+    """Build an in-memory PDF with one page per text string."""
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((72, 72), text, fontsize=24)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _make_text_pdf(page_texts: list[str]) -> bytes:
+    """Build a born-digital PDF whose pages carry a wrapped text layer."""
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 540, 720), text, fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _image_bytes(data_url: str) -> bytes:
+    return base64.b64decode(data_url.split(",", 1)[1])
+
+
+class TestTextLayer:
+    """Tests for the born-digital (text layer) path that skips vision."""
+
+    LONG_TEXT = "COMMERCIAL INVOICE INV-2024-001 " * 20
+
+    def test_classify_pdf(self):
+        assert _classify_pdf([self.LONG_TEXT]) == "text"
+        assert _classify_pdf(["", "  \n"]) == "scan"
+        assert _classify_pdf([]) == "scan"
+
+    def test_scanned_page_sends_document_to_vision(self):
+        """One page without a text layer (e.g. a scanned signature page) means vision."""
+        assert _classify_pdf([self.LONG_TEXT, ""]) == "scan"
+        assert _classify_pdf([self.LONG_TEXT, self.LONG_TEXT]) == "text"
+
+    def test_mixed_pdf_has_no_text_layer(self, service):
+        pdf = _make_text_pdf([self.LONG_TEXT, ""])
+        assert service._text_layer(pdf) is None
+
+    def test_sparse_text_goes_to_vision(self, service):
+        text = service._text_layer(_make_pdf(["short", "also short"]))
+        assert text is None
+
+    def test_text_layer_with_page_markers(self, service):
+        pdf = _make_text_pdf([self.LONG_TEXT, self.LONG_TEXT])
+        text = service._text_layer(pdf)
+        assert text.startswith("--- Page 1 ---\nCOMMERCIAL INVOICE")
+        assert "--- Page 2 ---" in text
+
+    def test_text_layer_invalid_pdf(self, service):
+        assert service._text_layer(b"not a pdf") is None
+
+    async def test_text_pdf_skips_vision(self, service):
+        service._text_layer = lambda pdf_bytes: "--- Page 1 ---\nINV-001"
+        service._pdf_to_images = lambda pdf_bytes: pytest.fail("should not render")
+        service._call_openai = AsyncMock()
+        service._call_openai_text = AsyncMock(return_value=VALID_JSON)
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        assert result.document_type == DocumentType.BOL
+        service._call_openai_text.assert_awaited_once_with("--- Page 1 ---\nINV-001", TEXT_PROMPT)
+        service._call_openai.assert_not_awaited()
+
+    @pytest.mark.parametrize("text,expected", [
+        ("--- Page 1 ---\nBILL OF LADING\nB/L No: MAEU123", DocumentType.BOL),
+        ("--- Page 1 ---\nCommercial Invoice\nINV-001", DocumentType.COMMERCIAL_INVOICE),
+        ("--- Page 1 ---\nPACKING LIST", DocumentType.PACKING_LIST),
+        # Invoice referencing its B/L is ambiguous
+        ("--- Page 1 ---\nCOMMERCIAL INVOICE\nB/L No: MAEU123", DocumentType.UNKNOWN),
+        ("--- Page 1 ---\nINV-001", DocumentType.UNKNOWN),
+        # Only the first page is considered
+        ("--- Page 1 ---\nPACKING LIST\n\n--- Page 2 ---\nBILL OF LADING", DocumentType.PACKING_LIST),
+    ])
+    def test_classify_document_type(self, text, expected):
+        assert _classify_document_type(text) == expected
+
+    def test_doctype_prompts_are_trimmed(self):
+        bol_prompt = TEXT_PROMPTS[DocumentType.BOL]
+        assert TEXT_PROMPTS[DocumentType.UNKNOWN] == TEXT_PROMPT
+        assert len(bol_prompt) < len(TEXT_PROMPT)
+        assert "AIR_WAYBILL_AWB" not in bol_prompt
+        assert "PACKING_LIST\" for" not in bol_prompt
+        assert "REQUIRED JSON SCHEMA" in bol_prompt
+
+    async def test_text_pdf_uses_doctype_prompt(self, service):
+        text = "--- Page 1 ---\nCOMMERCIAL INVOICE\nINV-001"
+        service._text_layer = lambda pdf_bytes: text
+        service._call_openai_text = AsyncMock(return_value=VALID_JSON)
+        await service.extract_from_pdf(b"%PDF-1.4\n")
+        service._call_openai_text.assert_awaited_once_with(
+            text, TEXT_PROMPTS[DocumentType.COMMERCIAL_INVOICE]
+        )
+
+
+class TestMultiPageExtraction:
+    """Tests for per-page fan-out and merging of multi-page PDFs."""
+
+    PAGE_1 = {
+        "document_type": "COMMERCIAL_INVOICE",
+        "invoice_number": "INV-001",
+        "invoice_number_confidence": 0.9,
+        "shipper_name": "Acme Corp",
+        "shipper_name_confidence": 0.6,
+        "identifiers": [{"type": "PO_NUMBER", "value": "PO-1", "model_confidence": 0.7}],
+        "tables": [{
+            "table_id": "table_1",
+            "headers": ["Model", "Qty"],
+            "rows": [{"cells": ["A-1", "10"], "row_confidence": 0.9}],
+            "cell_confidence": [[0.9, 0.9]],
+        }],
+    }
+    PAGE_2 = {
+        "document_type": "UNKNOWN",
+        "shipper_name": "ACME CORPORATION",
+        "shipper_name_confidence": 0.95,
+        "total_value_of_goods": "$1,000.00",
+        "total_value_of_goods_confidence": 0.8,
+        "identifiers": [{"type": "PO_NUMBER", "value": "PO-1", "model_confidence": 0.9}],
+        "tables": [
+            {
+                "table_id": "table_1",
+                "headers": ["Model", "Qty"],
+                "rows": [{"cells": ["B-2", "5"], "row_confidence": 0.8}],
+                "cell_confidence": [[0.8, 0.8]],
+            },
+            {
+                "table_id": "table_1",
+                "headers": ["Charge", "Amount"],
+                "rows": [{"cells": ["Freight", "$50"], "row_confidence": 0.9}],
+            },
+        ],
+    }
+
+    def test_merge_page_outputs(self, service):
+        merged = service._merge_page_outputs([
+            RawExtractionOutput.model_validate(self.PAGE_1),
+            RawExtractionOutput.model_validate(self.PAGE_2),
+        ])
+        assert merged.document_type == "COMMERCIAL_INVOICE"
+        assert merged.invoice_number == "INV-001"
+        # Highest-confidence value wins
+        assert merged.shipper_name == "ACME CORPORATION"
+        assert merged.shipper_name_confidence == 0.95
+        assert merged.total_value_of_goods == "$1,000.00"
+        # Duplicate identifier collapsed, keeping higher confidence
+        assert merged.identifiers == [{"type": "PO_NUMBER", "value": "PO-1", "model_confidence": 0.9}]
+        # Same headers concatenated; different headers kept separate with a unique id
+        assert len(merged.tables) == 2
+        assert [r["cells"] for r in merged.tables[0]["rows"]] == [["A-1", "10"], ["B-2", "5"]]
+        assert merged.tables[0]["cell_confidence"] == [[0.9, 0.9], [0.8, 0.8]]
+        assert merged.tables[1]["table_id"] == "table_1_p2"
+        assert merged.line_items is None
+
+    @staticmethod
+    def _table(table_id, headers, cells):
+        return {"table_id": table_id, "headers": headers, "rows": [{"cells": cells}]}
+
+    def test_same_page_tables_with_same_headers_stay_separate(self, service):
+        page = RawExtractionOutput.model_validate({"tables": [
+            self._table("table_1", ["A", "B"], ["1", "2"]),
+            self._table("table_2", ["A", "B"], ["3", "4"]),
+        ]})
+        merged = service._merge_page_outputs([page])
+        assert [t["table_id"] for t in merged.tables] == ["table_1", "table_2"]
+        assert [len(t["rows"]) for t in merged.tables] == [1, 1]
+
+    def test_continuation_joins_last_same_headed_table_of_previous_page(self, service):
+        page_1 = RawExtractionOutput.model_validate({"tables": [
+            self._table("table_1", ["A", "B"], ["1", "2"]),
+            self._table("table_2", ["A", "B"], ["3", "4"]),
+        ]})
+        page_2 = RawExtractionOutput.model_validate({"tables": [self._table("table_1", ["A", "B"], ["5", "6"])]})
+        merged = service._merge_page_outputs([page_1, page_2])
+        assert [[r["cells"] for r in t["rows"]] for t in merged.tables] == [[["1", "2"]], [["3", "4"], ["5", "6"]]]
+
+    def test_colliding_table_ids_stay_unique(self, service):
+        page_1 = RawExtractionOutput.model_validate({"tables": [self._table("table_1", ["A"], ["1"])]})
+        page_2 = RawExtractionOutput.model_validate({"tables": [
+            self._table("table_1", ["B"], ["2"]),
+            self._table("table_1", ["C"], ["3"]),
+        ]})
+        merged = service._merge_page_outputs([page_1, page_2])
+        assert [t["table_id"] for t in merged.tables] == ["table_1", "table_1_p2", "table_1_p2_2"]
+
+    async def test_pages_extracted_in_parallel(self, service):
+        pages = {"page-1": self.PAGE_1, "page-2": self.PAGE_2}
+
+        async def fake_call(page_images, prompt):
+            assert prompt == PAGE_PROMPT
+            assert len(page_images) == 1
+            return json.dumps(pages[page_images[0]])
+
+        service._text_layer = lambda pdf_bytes: None
+        service._pdf_to_images = lambda pdf_bytes: ["page-1", "page-2"]
+        service._call_openai = AsyncMock(side_effect=fake_call)
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        assert service._call_openai.await_count == 2
+        assert result.invoice_number.value == "INV-001"
+        assert len(result.tables) == 2
+
+    async def test_duplicate_pages_sent_once(self, service):
+        pages = {"page-1": self.PAGE_1, "terms": self.PAGE_2}
+
+        async def fake_call(page_images, prompt):
+            return json.dumps(pages[page_images[0]])
+
+        service._text_layer = lambda pdf_bytes: None
+        service._pdf_to_images = lambda pdf_bytes: ["page-1", "terms", "terms"]
+        service._call_openai = AsyncMock(side_effect=fake_call)
+        service._merge_page_outputs = MagicMock(wraps=service._merge_page_outputs)
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert result.extraction_error is None
+        assert service._call_openai.await_count == 2
+        # The repeated page's extraction is replayed in its original position
+        outputs = service._merge_page_outputs.call_args.args[0]
+        assert len(outputs) == 3
+        assert outputs[1] is outputs[2]
+
+    async def test_failed_page_fails_extraction(self, service):
+        async def fake_call(page_images, prompt):
+            return "not json" if page_images[0] == "page-2" else json.dumps(self.PAGE_1)
+
+        service._text_layer = lambda pdf_bytes: None
+        service._pdf_to_images = lambda pdf_bytes: ["page-1", "page-2"]
+        service._call_openai = AsyncMock(side_effect=fake_call)
+        service._call_openai_repair = AsyncMock(return_value="not json")
+        result = await service.extract_from_pdf(b"%PDF-1.4\n")
+        assert "after 2 attempts" in result.extraction_error
+
+    async def test_api_error_cancels_other_pages(self, service):
+        """An API exception on one page cancels the page requests still in flight."""
+        cancelled = asyncio.Event()
+
+        async def fake_call(page_images, prompt):
+            if page_images[0] == "page-1":
+                raise RuntimeError("rate limited")
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        service._text_layer = lambda pdf_bytes: None
+        service._pdf_to_images = lambda pdf_bytes: ["page-1", "page-2"]
+        service._call_openai = fake_call
+        with pytest.raises(RuntimeError, match="rate limited"):
+            await service.extract_from_pdf(b"%PDF-1.4\n")
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+
+class TestPdfToImages:
+    """Tests for _pdf_to_images() page rendering."""
+
+    def test_single_page(self, service):
+        pdf = _make_pdf(["PAGE ONE"])
+        images = service._pdf_to_images(pdf)
+        assert images == [_render_page(pdf, 0)]
+        assert images[0].startswith("data:image/jpeg;base64,/9j/")  # JPEG SOI marker
+
+    def test_multi_page_preserves_order(self, service):
+        pdf = _make_pdf(["PAGE ONE", "PAGE TWO", "PAGE THREE"])
+        images = service._pdf_to_images(pdf)
+        assert images == [_render_page(pdf, i) for i in range(3)]
+        assert len(set(images)) == 3
+
+    def test_identical_pages_render_identically(self, service):
+        """Duplicate-page detection relies on deterministic rendering."""
+        pdf = _make_pdf(["COVER", "TERMS", "TERMS"])
+        images = service._pdf_to_images(pdf)
+        assert images[1] == images[2]
+        assert images[0] != images[1]
+
+    def test_letter_page_rendered_at_render_dpi(self):
+        pix = fitz.Pixmap(_image_bytes(_render_page(_make_pdf(["LETTER"]), 0)))
+        assert (pix.width, pix.height) == (1020, 1320)
+
+    def test_large_page_clamped_to_max_long_side(self):
+        # 24x36 inch drawing would be 2880x4320 at 120 DPI
+        pdf = _make_pdf(["DRAWING"], width=24 * 72, height=36 * 72)
+        pix = fitz.Pixmap(_image_bytes(_render_page(pdf, 0)))
+        assert max(pix.width, pix.height) == MAX_LONG_SIDE_PX
+
+    def test_ledger_page_scaled_below_render_dpi(self):
+        # 12x18 inch page would be 1440x2160 at 120 DPI
+        pdf = _make_pdf(["LEDGER"], width=12 * 72, height=18 * 72)
+        pix = fitz.Pixmap(_image_bytes(_render_page(pdf, 0)))
+        assert pix.height == MAX_LONG_SIDE_PX
+        assert pix.width < pix.height
+
+    def test_pdf_path(self, service, tmp_path):
+        pdf = _make_pdf(["PAGE ONE", "PAGE TWO"])
+        path = tmp_path / "doc.pdf"
+        path.write_bytes(pdf)
+        assert service._pdf_to_images(str(path)) == service._pdf_to_images(pdf)
+
+    def test_max_pages(self, service):
+        pdf = _make_pdf([f"PAGE {i}" for i in range(7)])
+        assert len(service._pdf_to_images(pdf, max_pages=5)) == 5
+
+    def test_pool_recreated_after_shutdown(self, service):
+        pdf = _make_pdf(["PAGE ONE", "PAGE TWO"])
+        shutdown_render_pool()
+        assert len(service._pdf_to_images(pdf)) == 2
+
+    def test_invalid_pdf(self, service):
+        assert service._pdf_to_images(b"not a pdf") == []
@@ -0,0 +1,48 @@
+"""Scaling guards for table row merging.
+
+Wall-clock ratios are flaky on shared CI runners, so instead of timing the
+merge these check how it builds strings: a run of continuation lines must be
+joined in one pass, never concatenated line by line.
+"""
+from app.schemas import TableRow
+
+
+class _JoinOnly(str):
+    """A str that fails on concatenation or formatting; str.join never calls these."""
+
+    def _concatenated(self, *args):
+        raise AssertionError("continuation text was concatenated instead of joined")
+
+    __add__ = __radd__ = __format__ = __str__ = _concatenated
+
+
+def _continuation_run(n: int) -> list[TableRow]:
+    """One parent row followed by n description-only lines."""
+    rows = [TableRow(cells=["SKU-1", "1", "$1", "$1"], row_confidence=0.9)]
+    line = "description " * 8
+    rows += [TableRow(cells=[f"{line}{i:06d}", "", "", ""], row_confidence=0.8) for i in range(n)]
+    return rows
+
+
+def test_merge_alternating_rows(service):
+    rows = []
+    for i in range(5000):
+        rows.append(TableRow(cells=[f"SKU{i}", "1", "$1", "$1"], row_confidence=0.9))
+        rows.append(TableRow(cells=["desc", "", "", ""], row_confidence=0.8))
+    result = service._merge_continuation_rows(rows)
+    assert len(result) == 5000
+    assert result[-1].cells[0] == "SKU4999 - desc"
+
+
+def test_long_continuation_run_is_joined_once(service, monkeypatch):
+    """Continuation texts go straight into one join, so a long run stays linear."""
+    continuation_text = service._continuation_text
+
+    def join_only(cells):
+        text = continuation_text(cells)
+        return None if text is None else _JoinOnly(text)
+
+    monkeypatch.setattr(service, "_continuation_text", join_only)
+    rows = _continuation_run(16000)
+    (merged,) = service._merge_continuation_rows(rows)
+    assert merged.cells[0] == " - ".join(row.cells[0] for row in rows)
@@ -8,6 +8,10 @@ from app.schemas import (
     IdentifierType,
     CanonicalField,
     ConfidenceBadge,
+    TableRow,
+    TABLE_ROWS_ADAPTER,
+    DOC_TYPE_MAP,
+    ID_TYPE_MAP,
 )
 
 
@@ -127,6 +131,35 @@ class TestExtractionResponse:
         assert "JSON" in response.extraction_error
 
 
+class TestCanonicalField:
+    def test_frozen(self):
+        field = CanonicalField(value="MAEU123", model_confidence=0.9, final_confidence=85, badge=ConfidenceBadge.HIGH)
+        with pytest.raises(ValidationError):
+            field.value = "OTHER"
+
+
+class TestTableRow:
+    def test_default_confidence(self):
+        assert TableRow(cells=["a", None]).row_confidence == 0.5
+
+    def test_frozen(self):
+        """Rows are shared between merge passes, so they can't be reassigned."""
+        row = TableRow(cells=["a"], row_confidence=0.9)
+        with pytest.raises(ValidationError):
+            row.cells = ["b"]
+
+    def test_extra_fields_rejected(self):
+        with pytest.raises(ValidationError):
+            TableRow(cells=["a"], confidence=0.9)
+
+    def test_rows_adapter(self):
+        """The batch adapter builds the same rows and enforces the same bounds."""
+        rows = TABLE_ROWS_ADAPTER.validate_python([{"cells": ["a", ""], "row_confidence": 0.9}, {"cells": ["b"]}])
+        assert rows == [TableRow(cells=["a", ""], row_confidence=0.9), TableRow(cells=["b"])]
+        with pytest.raises(ValidationError):
+            TABLE_ROWS_ADAPTER.validate_python([{"cells": ["a"], "row_confidence": 1.5}])
+
+
 class TestDocumentType:
     def test_valid_types(self):
         assert DocumentType.BOL.value == "BOL"
@@ -149,6 +182,11 @@ class TestIdentifierType:
             "PO_NUMBER",
             "OTHER",
         ]
-        actual = [t.value for t in IdentifierType]
-        for exp in expected:
-            assert exp in actual
+        assert ID_TYPE_MAP.keys() == set(expected)
+
+    def test_lookup_maps(self):
+        """Value maps resolve known values and miss unknown ones."""
+        assert ID_TYPE_MAP["PO_NUMBER"] is IdentifierType.PO_NUMBER
+        assert ID_TYPE_MAP.get("TRACKING_NUMBER") is None
+        assert DOC_TYPE_MAP["BOL"] is DocumentType.BOL
+        assert len(DOC_TYPE_MAP) == len(DocumentType)